@@ -1,10 +1,41 @@
+import hashlib
+import json
+import multiprocessing
+import fnmatch
 import os
+import re
 import shutil
+import sqlite3
 import stat
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from itertools import chain
 import requests
-from flask import Flask, request, render_template_string
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import parse_qs, quote, urlencode, urlparse
+from requests.structures import CaseInsensitiveDict
+from flask import Flask, jsonify, request, render_template_string
 from git import Repo, GitCommandError
 from dotenv import load_dotenv
+from loc import COMMENT_SYNTAX, count_shard
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
 
 load_dotenv()
 
@@ -12,6 +43,77 @@ HF_TOKEN = os.getenv("HF_TOKEN", "")
 HF_MODEL = "mistralai/Mistral-7B-Instruct"
 HF_API = f"https://api-inference.huggingface.co/models/{HF_MODEL}"
 
+GITHUB_API = "https://api.github.com"
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN", "")
+GITHUB_TIMEOUT = 10
+GITHUB_RETRIES = 3
+GITHUB_BACKOFF = 0.5
+CACHE_DIR = os.getenv("REPOLENS_CACHE_DIR", os.path.join(os.path.expanduser("~"), "repo_lens_cache"))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("REPOLENS_HTTP_CACHE_MB", "64")) * 1024 * 1024
+RATE_LIMIT_RESERVE = 5
+RATE_LIMIT_PACING = 100
+RATE_LIMIT_MAX_WAIT = 20
+WORKERS = int(os.getenv("REPOLENS_WORKERS", "8"))
+ANALYSIS_DEADLINE = int(os.getenv("REPOLENS_DEADLINE", "120"))
+
+COMMITS_PER_PAGE = 100
+COMMIT_PAGE_WORKERS = 4
+
+# "blobless" fetches trees only and pulls single blobs on demand,
+# "full" checks out the whole work tree.
+CLONE_MODE = os.getenv("REPOLENS_CLONE_MODE", "blobless")
+# "api" lists files through the GitHub trees API and clones only when the
+# listing is truncated; "clone" always clones.
+ANALYSIS_BACKEND = os.getenv("REPOLENS_BACKEND", "api")
+
+CLONE_MAX_BYTES = int(os.getenv("REPOLENS_CLONE_MAX_MB", "500")) * 1024 * 1024
+CLONE_MAX_SECONDS = int(os.getenv("REPOLENS_CLONE_MAX_SECONDS", "60"))
+
+MIRROR_DIR = os.path.join(CACHE_DIR, "mirrors")
+MIRROR_QUOTA_BYTES = int(os.getenv("REPOLENS_MIRROR_MB", "2048")) * 1024 * 1024
+MIRROR_MIN_IDLE = 600
+REAPER_THREADS = 2
+
+RESULT_CACHE_SIZE = 256
+# Bump whenever the analysis or scoring changes so cached results from
+# older code are not served.
+SCORING_VERSION = 12
+
+# Directories that are never walked: dependencies, virtualenvs and build
+# output checked in by accident. Comma-separated names override the list.
+PRUNE_DIRS = set(filter(None, os.getenv(
+    "REPOLENS_PRUNE_DIRS",
+    "node_modules,bower_components,jspm_packages,vendor,third_party,dist,build,"
+    ".venv,venv,__pycache__,.tox,.mypy_cache,.pytest_cache,.next,.nuxt"
+).split(",")))
+
+# Pruned directories that hold copies of third-party code. They are still
+# walked for detectors that look at vendored files, such as duplicates.
+VENDOR_DIRS = {"vendor", "third_party", "node_modules", "bower_components", "jspm_packages"}
+
+# Build a NumPy column index of the listing and answer the detectors that
+# support it with vectorized queries (needs numpy).
+COLUMNAR_INDEX = os.getenv("REPOLENS_COLUMNAR", "0") == "1"
+
+# Directory levels kept in the structure trie; layout checks look no deeper.
+TRIE_DEPTH = 4
+WALK_THREADS = int(os.getenv("REPOLENS_WALK_THREADS", "1"))
+WALK_PARALLEL_MIN_DIRS = 8
+WALK_SPLIT_DEPTH = 2
+
+# Line counting runs on a process pool once a checkout has enough files
+# to pay for shipping them to workers.
+LOC_WORKERS = int(os.getenv("REPOLENS_LOC_WORKERS", str(os.cpu_count() or 1)))
+LOC_SHARD_FILES = 256
+LOC_PARALLEL_MIN_FILES = 1024
+
+# Duplicate detection only hashes files that share a size with another
+# file and are big enough for a copy to matter.
+HASH_THREADS = int(os.getenv("REPOLENS_HASH_THREADS", "4"))
+HASH_CHUNK_BYTES = 1024 * 1024
+DUPLICATE_MIN_BYTES = 1024
+DUPLICATE_MAX_GROUPS = 20
+
 TEMP_DIR = os.path.join(os.path.expanduser("~"), "repo_lens_temp")
 app = Flask(__name__)
 
@@ -19,10 +121,87 @@ def remove_readonly(func, path, _):
     os.chmod(path, stat.S_IWRITE)
     func(path)
 
+def safe_remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
 def safe_delete(path):
     if os.path.exists(path):
         shutil.rmtree(path, onerror=remove_readonly)
 
+def pid_alive(pid):
+    if os.name == "nt":
+        # os.kill(pid, 0) would send CTRL_C_EVENT on Windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class Reaper:
+    """
+    Deletes directories in the background. reap() renames the directory to
+    a trash-* entry (instant, and frees the name) and queues the rmtree on
+    a small pool that caps how many deletes run at once.
+    """
+
+    def __init__(self, max_concurrent=REAPER_THREADS):
+        self.pool = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="reaper")
+
+    def reap(self, path, trash_dir=TEMP_DIR):
+        if not os.path.exists(path):
+            return
+        trash = os.path.join(trash_dir, f"trash-{uuid.uuid4().hex}")
+        try:
+            os.makedirs(trash_dir, exist_ok=True)
+            os.rename(path, trash)
+        except OSError:
+            trash = path
+        self.pool.submit(safe_delete, trash)
+
+    def sweep(self, root, max_age=2 * ANALYSIS_DEADLINE):
+        """
+        Queues what crashed workers left behind in root: trash that was
+        never deleted, and analysis-<pid>-* directories whose process is
+        gone or that are older than any live analysis can be.
+        """
+        if not os.path.isdir(root):
+            return
+        now = time.time()
+        for e in os.scandir(root):
+            if not e.is_dir(follow_symlinks=False):
+                continue
+            if e.name.startswith("trash-"):
+                self.pool.submit(safe_delete, e.path)
+                continue
+            if not e.name.startswith("analysis-"):
+                continue
+            pid = e.name.split("-")[1]
+            dead = pid.isdigit() and int(pid) != os.getpid() and not pid_alive(int(pid))
+            try:
+                stale = now - e.stat().st_mtime > max_age
+            except OSError:
+                continue
+            if dead or stale:
+                self.reap(e.path, root)
+
+reaper = Reaper()
+
+def dir_size(path):
+    total = 0
+    for dirpath, _, fs in os.walk(path):
+        for f in fs:
+            try:
+                total += os.lstat(os.path.join(dirpath, f)).st_size
+            except OSError:
+                pass
+    return total
+
 # -------------------- HTML --------------------
 
 INDEX_HTML = """
@@ -147,6 +326,9 @@ RESULT_HTML = """
 <body>
   <div class="card">
     <h2>Score: {{ score }} / 100</h2>
+    {% if degraded %}
+      <p><i>Some repository data was unavailable ({{ degraded|join(", ") }}); the score leaves it out.</i></p>
+    {% endif %}
     <p><b>Summary:</b> {{ summary }}</p>
     <h3>Roadmap</h3>
     <ul>
@@ -166,176 +348,1997 @@ def parse_repo(url):
     parts = url.rstrip("/").split("/")
     return parts[-2], parts[-1]
 
+class GitHubError(Exception):
+    pass
+
+class GitHubRateLimited(GitHubError):
+    pass
+
+class RateLimitScheduler:
+    """
+    Keeps the X-RateLimit-Remaining / X-RateLimit-Reset budget seen by any
+    thread. Once fewer than `pacing` calls are left they are spread evenly
+    over what remains of the window, the last `reserve` calls wait for the
+    reset, and a call that would have to wait longer than max_wait raises
+    GitHubRateLimited so the caller can degrade instead of stalling. A
+    secondary rate limit (403/429 with Retry-After) holds every call until
+    it has passed, under the same max_wait.
+    """
+
+    def __init__(self, reserve=RATE_LIMIT_RESERVE, pacing=RATE_LIMIT_PACING,
+                 max_wait=RATE_LIMIT_MAX_WAIT):
+        self.reserve = reserve
+        self.pacing = pacing
+        self.max_wait = max_wait
+        self.lock = threading.Lock()
+        self.remaining = None
+        self.reset = 0
+        self.next_slot = 0
+        self.retry_at = 0
+
+    def acquire(self):
+        with self.lock:
+            now = time.time()
+            if now < self.retry_at:
+                delay = self.retry_at - now
+                if delay > self.max_wait:
+                    raise GitHubRateLimited(f"GitHub asked to retry in {int(delay)}s")
+            elif self.remaining is None or now >= self.reset:
+                self.remaining = None
+                return
+            else:
+                if self.remaining <= self.reserve:
+                    delay = self.reset - now
+                elif self.remaining <= self.pacing:
+                    interval = (self.reset - now) / (self.remaining - self.reserve)
+                    slot = max(now, self.next_slot)
+                    self.next_slot = slot + interval
+                    delay = slot - now
+                else:
+                    delay = 0
+
+                if delay > self.max_wait:
+                    raise GitHubRateLimited(f"GitHub rate limit resets in {int(self.reset - now)}s")
+                self.remaining -= 1
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def update(self, response):
+        retry_after = response.headers.get("Retry-After")
+        if response.status_code in (403, 429) and retry_after and retry_after.isdigit():
+            with self.lock:
+                self.retry_at = max(self.retry_at, time.time() + int(retry_after))
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        with self.lock:
+            self.remaining = int(remaining)
+            self.reset = float(reset)
+
+    def exhausted(self, response):
+        return response.status_code in (403, 429) and (
+            response.headers.get("X-RateLimit-Remaining") == "0"
+            or "Retry-After" in response.headers
+        )
+
+class GitHubCache:
+    """
+    On-disk store of GitHub responses with their ETag/Last-Modified, used
+    to send conditional requests. A 304 is served from the stored body and
+    does not count against the rate limit. Entries are evicted least
+    recently used first once the directory grows past max_bytes; recency
+    survives restarts through file mtimes.
+    """
+
+    KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Link")
+
+    def __init__(self, path, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.entries = OrderedDict()
+        self.size = 0
+
+        os.makedirs(path, exist_ok=True)
+        found = []
+        for e in os.scandir(path):
+            if e.is_file() and e.name.endswith(".json"):
+                st = e.stat()
+                found.append((st.st_mtime, e.name[:-5], st.st_size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.size += size
+
+    @staticmethod
+    def key(url, params=None, accept="", limit=None):
+        query = urlencode(sorted((params or {}).items()))
+        prefix = f" [:{limit}]" if limit is not None else ""
+        return hashlib.sha1(f"{accept} {url}?{query}{prefix}".encode()).hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key + ".json")
+
+    def lookup(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+        try:
+            with open(self._file(key), encoding="utf-8") as fh:
+                entry = json.load(fh)
+            os.utime(self._file(key))
+            return entry
+        except (OSError, ValueError):
+            self._drop(key)
+            return None
+
+    def store(self, key, response):
+        headers = {h: response.headers[h] for h in self.KEPT_HEADERS if h in response.headers}
+        if "ETag" not in headers and "Last-Modified" not in headers:
+            return
+        tmp = f"{self._file(key)}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump({"headers": headers, "body": response.text}, fh)
+            size = os.path.getsize(tmp)
+            os.replace(tmp, self._file(key))
+        except OSError:
+            safe_remove(tmp)
+            return
+
+        with self.lock:
+            self.size += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                old, old_size = self.entries.popitem(last=False)
+                self.size -= old_size
+                self.evictions += 1
+                safe_remove(self._file(old))
+
+    def _drop(self, key):
+        with self.lock:
+            self.size -= self.entries.pop(key, 0)
+        safe_remove(self._file(key))
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if "ETag" in entry["headers"]:
+            headers["If-None-Match"] = entry["headers"]["ETag"]
+        if "Last-Modified" in entry["headers"]:
+            headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        return headers
+
+    def response(self, entry, url):
+        r = requests.Response()
+        r.status_code = 200
+        r.url = url
+        r.encoding = "utf-8"
+        r.headers = CaseInsensitiveDict(entry["headers"])
+        r._content = entry["body"].encode("utf-8")
+        return r
+
+    def record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "bytes": self.size
+            }
+
+class GitHubClient:
+    """
+    One keep-alive session for every GitHub call. 5xx responses are
+    retried with jittered exponential backoff (honouring Retry-After),
+    while a rate-limit 403/429 is retried once after the scheduler has
+    waited it out, and every request gets a timeout. With a cache, stored responses are
+    revalidated with If-None-Match / If-Modified-Since. Every call goes
+    through the rate-limit scheduler first.
+    """
+
+    def __init__(self, token=GITHUB_TOKEN, pool_size=WORKERS * COMMIT_PAGE_WORKERS,
+                 retries=GITHUB_RETRIES, backoff=GITHUB_BACKOFF, timeout=GITHUB_TIMEOUT,
+                 cache=None, scheduler=None):
+        self.timeout = timeout
+        self.cache = cache
+        self.scheduler = scheduler or RateLimitScheduler()
+        self.session = requests.Session()
+        self.session.headers["Accept"] = "application/vnd.github+json"
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            backoff_jitter=backoff,
+            # 403/429 rate limits go to the scheduler: urllib3 would sleep
+            # out any Retry-After, however long, inside the request
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=("GET", "HEAD"),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry
+        )
+        self.session.mount("https://", adapter)
+
+    def get(self, path, params=None, timeout=None, accept=None, limit=None):
+        """
+        GET path under GITHUB_API. With a limit the body is streamed and
+        only its first limit bytes are read before the connection is
+        dropped; that prefix is cached under its own key.
+        """
+        url = GITHUB_API + path
+        key = entry = None
+        headers = {"Accept": accept} if accept else {}
+        if self.cache is not None:
+            key = self.cache.key(url, params, accept or "", limit)
+            entry = self.cache.lookup(key)
+            if entry:
+                headers.update(self.cache.conditional_headers(entry))
+
+        # a rate-limited call is tried once more: acquire() then sleeps out
+        # the wait if it fits in max_wait, and raises GitHubRateLimited if not
+        for attempt in range(2):
+            self.scheduler.acquire()
+            r = self.session.get(
+                url,
+                params=params,
+                headers=headers,
+                timeout=timeout or self.timeout,
+                stream=limit is not None
+            )
+            self.scheduler.update(r)
+            if not self.scheduler.exhausted(r):
+                break
+            r.close()
+        else:
+            raise GitHubRateLimited("GitHub rate limit exhausted")
+        if limit is not None:
+            with r:
+                data = bytearray()
+                for chunk in r.iter_content(chunk_size=16384):
+                    data += chunk[:limit - len(data)]
+                    if len(data) >= limit:
+                        break
+            r._content = bytes(data)
+        if self.cache is None:
+            return r
+
+        if r.status_code == 304 and entry:
+            self.cache.record(hit=True)
+            return self.cache.response(entry, r.url)
+
+        self.cache.record(hit=False)
+        if r.status_code == 200:
+            self.cache.store(key, r)
+        return r
+
+# gets its cache in init()
+github = GitHubClient()
+
 def github_repo_info(owner, repo):
-    r = requests.get(f"https://api.github.com/repos/{owner}/{repo}", timeout=10)
+    r = github.get(f"/repos/{owner}/{repo}")
     return r.json() if r.ok else {}
 
-def github_commit_count(owner, repo):
+def _last_page(r):
+    last = r.links.get("last", {}).get("url")
+    if not last:
+        return None
+    page = parse_qs(urlparse(last).query).get("page")
+    return int(page[0]) if page else None
+
+def _commit_page(owner, repo, page):
+    r = github.get(
+        f"/repos/{owner}/{repo}/commits",
+        params={"per_page": COMMITS_PER_PAGE, "page": page}
+    )
+    if not r.ok:
+        raise GitHubError(f"commit page {page} failed with HTTP {r.status_code}")
+    return r.json()
+
+def _walk_commit_pages(owner, repo):
     total = 0
     page = 1
-    while True:
-        r = requests.get(
-            f"https://api.github.com/repos/{owner}/{repo}/commits",
-            params={"per_page": 100, "page": page},
-            timeout=10
+    with ThreadPoolExecutor(max_workers=COMMIT_PAGE_WORKERS) as pool:
+        while True:
+            pages = range(page, page + COMMIT_PAGE_WORKERS)
+            batch = pool.map(lambda p: _commit_page(owner, repo, p), pages)
+            for commits in batch:
+                total += len(commits)
+                if len(commits) < COMMITS_PER_PAGE:
+                    return total
+            page += COMMIT_PAGE_WORKERS
+
+def github_commit_count(owner, repo):
+    """
+    With per_page=1 the page number of the "last" link is the commit
+    count, so the total costs a single request. Only when GitHub (or a
+    proxy in front of it) leaves out the Link header do we walk the pages.
+
+    Raises GitHubError rather than returning a partial count when a page
+    cannot be fetched, e.g. because the rate limit ran out mid-walk.
+    """
+    r = github.get(f"/repos/{owner}/{repo}/commits", params={"per_page": 1})
+    if r.status_code in (404, 409):
+        return 0
+    if not r.ok:
+        raise GitHubError(f"commit count failed with HTTP {r.status_code}")
+
+    last = _last_page(r)
+    if last is not None:
+        return last
+
+    if not r.json():
+        return 0
+    return _walk_commit_pages(owner, repo)
+
+def github_tree(owner, repo):
+    """
+    Every blob path of the default branch with its size, from one recursive
+    trees call, and whether GitHub truncated the listing.
+    """
+    r = github.get(f"/repos/{owner}/{repo}/git/trees/HEAD", params={"recursive": 1})
+    if not r.ok:
+        raise GitHubError(f"tree listing failed with HTTP {r.status_code}")
+    data = r.json()
+    tree = {
+        e["path"]: e.get("size", 0)
+        for e in data["tree"]
+        if e["type"] == "blob"
+    }
+    return tree, bool(data.get("truncated"))
+
+def github_file(owner, repo, path, limit=None):
+    """
+    Raw file contents from the contents API. With a limit only that many
+    bytes are downloaded before the connection is dropped.
+    """
+    r = github.get(
+        f"/repos/{owner}/{repo}/contents/{quote(path)}",
+        accept="application/vnd.github.raw",
+        limit=limit
+    )
+    if not r.ok:
+        raise GitHubError(f"fetching {path} failed with HTTP {r.status_code}")
+    return r.content
+
+# -------------------- GIT --------------------
+
+PROGRESS_SIZE = re.compile(r"Receiving objects:.*?([\d.]+) (B|KiB|MiB|GiB)")
+SIZE_UNITS = {"B": 1, "KiB": 1024, "MiB": 1024 ** 2, "GiB": 1024 ** 3}
+
+class CloneBudgetExceeded(Exception):
+    def __init__(self, budget):
+        super().__init__(f"git transfer exceeded its {budget} budget")
+        self.budget = budget
+
+def run_git(args, max_bytes=CLONE_MAX_BYTES, max_seconds=CLONE_MAX_SECONDS):
+    """
+    Runs a cloning/fetching git command with --progress and kills it once
+    the bytes it reports receiving or its wall time go over budget, raising
+    CloneBudgetExceeded with the budget that was hit ("bytes" or "time").
+    LFS smudging is disabled so pointer files are never resolved.
+    """
+    cmd = ["git", *args]
+    env = {**os.environ, "GIT_LFS_SKIP_SMUDGE": "1", "GIT_TERMINAL_PROMPT": "0"}
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env)
+    tail = deque(maxlen=20)
+    hit = []
+
+    def watch():
+        buf = b""
+        while True:
+            chunk = proc.stderr.read1(65536)
+            if not chunk:
+                break
+            *lines, buf = re.split(rb"[\r\n]", buf + chunk)
+            for line in lines:
+                line = line.decode(errors="ignore")
+                if not line:
+                    continue
+                tail.append(line)
+                m = PROGRESS_SIZE.search(line)
+                if m and float(m.group(1)) * SIZE_UNITS[m.group(2)] > max_bytes and not hit:
+                    hit.append("bytes")
+                    proc.kill()
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        proc.wait(timeout=max_seconds)
+    except subprocess.TimeoutExpired:
+        if not hit:
+            hit.append("time")
+        proc.kill()
+        proc.wait()
+    watcher.join()
+
+    if hit:
+        raise CloneBudgetExceeded(hit[0])
+    if proc.returncode:
+        raise GitCommandError(cmd, proc.returncode, "\n".join(tail))
+
+class CatFile:
+    """
+    A long-lived `git cat-file --batch` process for one repository. Blobs
+    are requested by sha or by "<rev>:<path>" and streamed back without a
+    work tree; in a partial clone git fetches a missing blob on demand.
+    With a limit, only the first `limit` bytes are kept and the rest of the
+    blob is drained from the pipe.
+    """
+
+    def __init__(self, git_dir):
+        self.git_dir = git_dir
+        self.lock = threading.Lock()
+        self.proc = None
+
+    def _start(self):
+        self.proc = subprocess.Popen(
+            ["git", "-C", self.git_dir, "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}
         )
-        if not r.ok or not r.json():
-            break
-        total += len(r.json())
-        page += 1
-    return total
+
+    def _died(self, spec):
+        """Drops a process that died mid-request; the next read starts a new one."""
+        self.proc.kill()
+        self.proc.wait()
+        self.proc = None
+        return GitCommandError(["git", "cat-file", "--batch"], 1, f"cat-file exited reading {spec}")
+
+    def read(self, spec, limit=None):
+        with self.lock:
+            if self.proc is None or self.proc.poll() is not None:
+                self._start()
+            try:
+                self.proc.stdin.write(spec.encode() + b"\n")
+                self.proc.stdin.flush()
+            except OSError:
+                raise self._died(spec)
+
+            header = self.proc.stdout.readline()
+            if not header:
+                raise self._died(spec)
+            if header.endswith(b" missing\n") or header.endswith(b" ambiguous\n"):
+                raise KeyError(spec)
+
+            left = int(header.split()[2])
+            keep = left if limit is None else min(left, limit)
+            data = self.proc.stdout.read(keep)
+            if len(data) < keep:
+                raise self._died(spec)
+            left -= keep
+            while left:
+                chunk = self.proc.stdout.read(min(left, 65536))
+                if not chunk:
+                    raise self._died(spec)
+                left -= len(chunk)
+            self.proc.stdout.read(1)
+            return data
+
+    def close(self):
+        with self.lock:
+            if self.proc is not None:
+                self.proc.stdin.close()
+                self.proc.wait()
+                self.proc = None
+
+cat_files = {}
+cat_files_lock = threading.Lock()
+
+def cat_file(git_dir):
+    with cat_files_lock:
+        if git_dir not in cat_files:
+            cat_files[git_dir] = CatFile(git_dir)
+        return cat_files[git_dir]
+
+def close_cat_file(git_dir):
+    with cat_files_lock:
+        cf = cat_files.pop(git_dir, None)
+    if cf is not None:
+        cf.close()
+
+# -------------------- REPO MIRRORS --------------------
+
+def canonical_repo(url):
+    owner, repo = parse_repo(url)
+    if repo.endswith(".git"):
+        repo = repo[:-4]
+    host = urlparse(url).netloc or "local"
+    return f"{host}/{owner}/{repo}".lower()
+
+class MirrorStore:
+    """
+    Bare, depth-1 copies of analyzed repos kept on disk between requests and
+    refreshed with `git fetch`, so a repeat analysis only transfers what
+    changed. Blobless and full mirrors are kept apart. When the store grows
+    past its quota, the least recently used mirrors that have been idle for
+    at least MIRROR_MIN_IDLE seconds are deleted.
+    """
+
+    def __init__(self, path, quota):
+        self.path = path
+        self.quota = quota
+        self.lock = threading.Lock()
+        self.repo_locks = {}
+        self.sizes = {}
+
+        os.makedirs(path, exist_ok=True)
+        for e in os.scandir(path):
+            if e.is_dir() and e.name.endswith(".git"):
+                self.sizes[e.name] = dir_size(e.path)
+
+    def _name(self, url, mode):
+        name = canonical_repo(url).replace("/", "__")
+        if mode == "blobless":
+            name += ".blobless"
+        return name + ".git"
+
+    def _repo_lock(self, name):
+        with self.lock:
+            return self.repo_locks.setdefault(name, threading.Lock())
+
+    def get(self, url, mode=CLONE_MODE):
+        name = self._name(url, mode)
+        path = os.path.join(self.path, name)
+
+        with self._repo_lock(name):
+            if os.path.isdir(path):
+                try:
+                    self._refresh(path)
+                except GitCommandError as e:
+                    app.logger.warning("refreshing mirror %s failed, recloning: %s", name, e)
+                    close_cat_file(path)
+                    reaper.reap(path, self.path)
+            if not os.path.isdir(path):
+                self._clone(url, path, mode)
+            os.utime(path)
+            size = dir_size(path)
+
+        with self.lock:
+            self.sizes[name] = size
+        self.evict(keep=name)
+        return path
+
+    def _clone(self, url, path, mode):
+        options = ["--filter=blob:none"] if mode == "blobless" else []
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        safe_delete(tmp)
+        try:
+            run_git(["clone", "--progress", "--bare", "--depth=1", *options, "--", url, tmp])
+            os.rename(tmp, path)
+        finally:
+            reaper.reap(tmp, self.path)
+
+    def _refresh(self, path):
+        head = Repo(path).git.symbolic_ref("HEAD")
+        run_git(["--git-dir", path, "fetch", "--progress", "--depth=1", "origin", f"+HEAD:{head}"])
+
+    def evict(self, keep=None):
+        with self.lock:
+            total = sum(self.sizes.values())
+            if total <= self.quota:
+                return
+            names = [n for n in self.sizes if n != keep]
+
+        idle_before = time.time() - MIRROR_MIN_IDLE
+        by_age = []
+        for name in names:
+            try:
+                by_age.append((os.path.getmtime(os.path.join(self.path, name)), name))
+            except OSError:
+                pass
+
+        for used, name in sorted(by_age):
+            if total <= self.quota or used > idle_before:
+                break
+            lock = self._repo_lock(name)
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                close_cat_file(os.path.join(self.path, name))
+                reaper.reap(os.path.join(self.path, name), self.path)
+            finally:
+                lock.release()
+            with self.lock:
+                total -= self.sizes.pop(name, 0)
+
+# set up by init()
+mirrors = None
+
+def checkout_mirror(mirror, dest):
+    # a private index keeps concurrent checkouts from the same mirror apart
+    index = dest + ".index"
+    try:
+        subprocess.run(
+            ["git", "--git-dir", mirror, "--work-tree", dest, "checkout", "-f", "HEAD", "--", "."],
+            env={**os.environ, "GIT_INDEX_FILE": index},
+            check=True,
+            capture_output=True
+        )
+    finally:
+        safe_remove(index)
 
 # -------------------- REPO ANALYSIS --------------------
 
-def clone_repo(url):
-    safe_delete(TEMP_DIR)
-    Repo.clone_from(url, TEMP_DIR, depth=1)
-    safe_delete(os.path.join(TEMP_DIR, ".git"))
+def clone_repo(url, dest, mode=CLONE_MODE):
+    if mode == "blobless":
+        run_git(["clone", "--progress", "--depth=1", "--filter=blob:none", "--no-checkout", "--", url, dest])
+        return
+    run_git(["clone", "--progress", "--depth=1", "--", url, dest])
+    reaper.reap(os.path.join(dest, ".git"))
+
+# One record per file, built once while listing. path always uses "/",
+# parts are its components and depth is len(parts); kind is "file" or
+# "link".
+FileEntry = namedtuple("FileEntry", "path parts depth size kind")
+
+def file_entry(path, size=0, kind="file"):
+    parts = tuple(path.split("/"))
+    return FileEntry(path, parts, len(parts), size, kind)
+
+def glob_regex(pattern):
+    """
+    Translates a .gitignore/.gitattributes glob into a regex over "/"
+    paths. Patterns without an inner slash match at any depth.
+    """
+    anchored = "/" in pattern.rstrip("/")
+    pattern = pattern.strip("/")
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            out.append("[" + pattern[i + 1:end].replace("!", "^", 1) + "]")
+            i = end + 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    prefix = "^" if anchored else "^(?:.*/)?"
+    return re.compile(prefix + "".join(out) + "$")
+
+class Pruner:
+    """
+    Decides which parts of a repo the walk skips: directories named in
+    PRUNE_DIRS, paths matched by the root .gitignore (tracked files that
+    should not be there) and paths marked linguist-vendored or
+    linguist-generated in .gitattributes. A skipped directory counts once
+    in skipped(), however many files it holds.
+
+    Pruned files that are vendored (under VENDOR_DIRS or marked
+    linguist-vendored) are passed to `on_vendored` instead of being
+    dropped, when it is set, and the walk descends into their directories.
+
+    Unlike an ignored directory, a marked one can be unmarked further
+    down ("-linguist-vendored"); once any rule unsets a marker, markers
+    are only applied to files so the walk still reaches those paths.
+    """
 
-def analyze_files():
+    def __init__(self, dirs=PRUNE_DIRS):
+        self.dirs = set(dirs)
+        self.rules = []
+        self.unset_markers = False
+        self.on_vendored = None
+        self.pruned = {}
+        self.skipped_dirs = set()
+        self.skipped_files = 0
+
+    def load_rules(self, read):
+        for name, parse in ((".gitignore", self._ignore_rules), (".gitattributes", self._attribute_rules)):
+            try:
+                text = read(name).decode(errors="ignore")
+            except (KeyError, OSError, GitCommandError, GitHubError, requests.RequestException):
+                continue
+            for line in text.splitlines():
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    rule = parse(line)
+                    if rule:
+                        self.rules.append(rule)
+
+    def _ignore_rules(self, line):
+        negate = line.startswith("!")
+        pattern = line[1:] if negate else line
+        return glob_regex(pattern), not negate, pattern.endswith("/"), False, False
+
+    def _attribute_rules(self, line):
+        pattern, *attrs = line.split()
+        for attr in attrs:
+            name, _, value = attr.lstrip("-!").partition("=")
+            if name in ("linguist-vendored", "linguist-generated"):
+                skip = not attr.startswith(("-", "!")) and value in ("", "true")
+                self.unset_markers = self.unset_markers or not skip
+                return glob_regex(pattern), skip, False, name == "linguist-vendored", True
+        return None
+
+    def _matches(self, path, is_dir, vendored_only=False, markers=True):
+        skip = False
+        for regex, value, dir_only, vendored, marker in self.rules:
+            if (
+                (vendored or not vendored_only)
+                and (is_dir or not dir_only)
+                and (markers or not marker)
+                and regex.match(path)
+            ):
+                skip = value
+        return skip
+
+    def vendored(self, parts, is_dir=True):
+        if is_dir and parts[-1] in VENDOR_DIRS:
+            return True
+        return self._matches("/".join(parts), is_dir, vendored_only=True)
+
+    def walk_dir(self, parts):
+        """Whether the walk opens the directory `parts`."""
+        outer = self.skip_dir(parts)
+        return outer is None or (self.on_vendored is not None and self.vendored(outer))
+
+    def skip_dir(self, parts):
+        """
+        The outermost pruned directory containing (or equal to) the
+        directory `parts`, or None.
+        """
+        if not parts:
+            return None
+        if parts not in self.pruned:
+            outer = self.skip_dir(parts[:-1])
+            if outer is None and (
+                parts[-1] in self.dirs
+                or self._matches("/".join(parts), True, markers=not self.unset_markers)
+            ):
+                outer = parts
+            self.pruned[parts] = outer
+        outer = self.pruned[parts]
+        if outer is not None:
+            self.skipped_dirs.add(outer)
+        return outer
+
+    def filter(self, files):
+        for entry in files:
+            outer = self.skip_dir(entry.parts[:-1])
+            if outer is not None:
+                if self.on_vendored is not None and self.vendored(outer):
+                    self.on_vendored(entry)
+                continue
+            if self.rules and self._matches(entry.path, False):
+                self.skipped_files += 1
+                if self.on_vendored is not None and self.vendored(entry.parts, False):
+                    self.on_vendored(entry)
+                continue
+            yield entry
+
+    def skipped(self):
+        return len(self.skipped_dirs) + self.skipped_files
+
+def scan_dir(prefix, path, sizes, pruner):
+    """
+    One directory's file entries plus the subdirectories to descend into.
+    Like os.walk, symlinks to directories are not followed and other
+    symlinks count as files. Without `sizes` no stat call is made and sizes
+    are 0. Directories the pruner skips are never opened, except vendored
+    ones it still wants to see.
+    """
     files = []
-    for root, _, fs in os.walk(TEMP_DIR):
-        for f in fs:
-            files.append(os.path.join(root, f))
-    return files
+    dirs = []
+    with os.scandir(path) as it:
+        for e in it:
+            parts = prefix + (e.name,)
+            if e.is_dir(follow_symlinks=False):
+                if pruner is None or pruner.walk_dir(parts):
+                    dirs.append((parts, e.path))
+            elif e.is_symlink():
+                if not e.is_dir():
+                    files.append(FileEntry("/".join(parts), parts, len(parts), 0, "link"))
+            else:
+                size = e.stat(follow_symlinks=False).st_size if sizes else 0
+                files.append(FileEntry("/".join(parts), parts, len(parts), size, "file"))
+    return files, dirs
+
+def walk(stack, sizes, pruner):
+    while stack:
+        prefix, path = stack.pop()
+        files, dirs = scan_dir(prefix, path, sizes, pruner)
+        stack.extend(dirs)
+        yield from files
+
+def walk_subtree(subtree, sizes, pruner):
+    return list(walk([subtree], sizes, pruner))
+
+def iter_files(root, sizes=True, pruner=None, threads=WALK_THREADS):
+    """
+    Walks a checkout lazily, yielding every entry of a directory before
+    descending, so the root comes first.
+
+    Wide trees are walked in parallel: the top levels are expanded
+    breadth-first until there are enough subtrees to keep `threads` busy,
+    each subtree is walked on the pool and the results are yielded in
+    sorted subtree order, so the output does not depend on thread timing.
+    At most 2 * threads subtrees are walked ahead of the consumer.
+    Trees with fewer than WALK_PARALLEL_MIN_DIRS subtrees take the plain
+    serial walk.
+    """
+    if threads <= 1:
+        yield from walk([((), root)], sizes, pruner)
+        return
 
-def detect_readme(files):
+    frontier = [((), root)]
+    for _ in range(WALK_SPLIT_DEPTH):
+        if len(frontier) >= threads * 4:
+            break
+        expanded = []
+        for prefix, path in frontier:
+            files, dirs = scan_dir(prefix, path, sizes, pruner)
+            yield from files
+            expanded.extend(dirs)
+        frontier = sorted(expanded)
+
+    if len(frontier) < WALK_PARALLEL_MIN_DIRS:
+        yield from walk(frontier[::-1], sizes, pruner)
+        return
+
+    pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="walk")
+    try:
+        # keep only a window of finished shards in memory ahead of the consumer
+        pending = iter(frontier)
+        shards = deque()
+        for subtree in pending:
+            shards.append(pool.submit(walk_subtree, subtree, sizes, pruner))
+            if len(shards) >= threads * 2:
+                break
+        while shards:
+            files = shards.popleft().result()
+            for subtree in pending:
+                shards.append(pool.submit(walk_subtree, subtree, sizes, pruner))
+                break
+            yield from files
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def disk_reader(root):
+    def read(path, limit=None):
+        with open(os.path.join(root, *path.split("/")), "rb") as fh:
+            return fh.read(-1 if limit is None else limit)
+
+    return read
+
+def iter_tree(git_dir, rev):
+    """
+    Streams the blob entries of `rev` from `git ls-tree` in a clone without
+    a work tree. Submodules show up as commits and are skipped, like the
+    empty directories a full checkout leaves for them. A failed ls-tree
+    raises GitCommandError once its output is drained, so a bad rev or
+    a broken mirror is not mistaken for an empty repo.
+    """
+    args = ["git", "-C", git_dir, "ls-tree", "-r", "-z", "--full-tree", rev]
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        buf = b""
+        while True:
+            chunk = proc.stdout.read1(65536)
+            if not chunk:
+                break
+            *records, buf = (buf + chunk).split(b"\0")
+            for record in records:
+                meta, path = record.split(b"\t", 1)
+                if meta.split()[1] == b"blob":
+                    yield file_entry(path.decode("utf-8", "surrogateescape"))
+        # ls-tree only writes a line or two to stderr, so this cannot block
+        stderr = proc.stderr.read()
+        if proc.wait():
+            raise GitCommandError(args, proc.returncode, stderr)
+    finally:
+        if proc.poll() is None:
+            # the consumer stopped early
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+def blob_reader(git_dir, rev):
+    blobs = cat_file(git_dir)
+
+    def read(path, limit=None):
+        return blobs.read(f"{rev}:{path}", limit)
+
+    return read
+
+# -------------------- PATH TRIE --------------------
+
+class TrieNode:
+    __slots__ = ("children", "files")
+
+    def __init__(self):
+        self.children = {}
+        self.files = 0
+
+class PathTrie:
+    """
+    Directories of a repo as a prefix trie, each shared prefix stored once,
+    with the number of files below every node. Only the first max_depth
+    levels are kept, which is all layout questions need, so memory follows
+    the shallow directory count rather than the number of paths.
+    """
+
+    def __init__(self, max_depth=TRIE_DEPTH):
+        self.root = TrieNode()
+        self.max_depth = max_depth
+
+    def insert(self, dir_parts):
+        """
+        Counts one file in the directory dir_parts. Returns True when a new
+        directory node was created.
+        """
+        node = self.root
+        node.files += 1
+        added = False
+        for name in dir_parts[:self.max_depth]:
+            child = node.children.get(name)
+            if child is None:
+                child = node.children[name] = TrieNode()
+                added = True
+            child.files += 1
+            node = child
+        return added
+
+    def __len__(self):
+        return self.root.files
+
+    def find(self, prefix):
+        node = self.root
+        for name in filter(None, prefix.split("/")):
+            node = node.children.get(name)
+            if node is None:
+                return None
+        return node
+
+    def count(self, prefix=""):
+        node = self.find(prefix)
+        return node.files if node else 0
+
+    def glob(self, pattern):
+        """
+        Directory paths matching a "/"-separated pattern; segments use
+        fnmatch syntax and "**" spans any number of levels.
+        """
+        segments = [s for s in pattern.split("/") if s]
+
+        def match(node, i, path):
+            if i == len(segments):
+                yield "/".join(path)
+                return
+            seg = segments[i]
+            if seg == "**":
+                yield from match(node, i + 1, path)
+                for name, child in node.children.items():
+                    yield from match(child, i, path + [name])
+                return
+            if not any(c in seg for c in "*?["):
+                child = node.children.get(seg)
+                if child is not None:
+                    yield from match(child, i + 1, path + [seg])
+                return
+            for name, child in node.children.items():
+                if fnmatch.fnmatchcase(name, seg):
+                    yield from match(child, i + 1, path + [name])
+
+        return match(self.root, 0, [])
+
+    def exists(self, pattern):
+        return next(self.glob(pattern), None) is not None
+
+    def at_depth(self, depth):
+        return list(self.glob("/".join(["*"] * depth)))
+
+# -------------------- DETECTORS --------------------
+
+DETECTORS = []
+
+def detector(cls):
+    DETECTORS.append(cls)
+    return cls
+
+class Detector:
+    """
+    A visitor on the single pass over a repo's file entries. `needs` says
+    what it looks at: "names" (paths only), "sizes" (entry sizes must be
+    filled in), "contents" (self.read is set to a reader taking a
+    path and an optional byte limit) or "checkout" (self.checkout is the
+    directory the files are checked out in, or None when the listing has
+    no working tree; sizes are filled in too). A detector sets self.done
+    once its
+    answer cannot change, and result() returns the analysis keys it
+    contributes.
+    """
+
+    needs = "names"
+    # also visit_vendored() the vendored files the pruner drops
+    vendored = False
+
+    def __init__(self):
+        self.done = False
+        self.read = None
+        self.checkout = None
+
+    def visit(self, entry):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+    def from_index(self, index):
+        """
+        The result computed from a ColumnarIndex, or None when the detector
+        has to visit entries.
+        """
+        return None
+
+    def visit_vendored(self, entry):
+        raise NotImplementedError
+
+def run_detectors(files, detectors, read=None, checkout=None):
+    """
+    Feeds every entry to the detectors that are still running and stops
+    pulling from `files` as soon as all of them are done, so a lazy walk
+    is cut short too.
     """
-    README is valid only if:
+    for d in detectors:
+        if d.needs == "contents":
+            d.read = read
+        elif d.needs == "checkout":
+            d.checkout = checkout
+
+    active = [d for d in detectors if not d.done]
+    for entry in files:
+        if not active:
+            break
+        for d in active:
+            d.visit(entry)
+        if any(d.done for d in active):
+            active = [d for d in active if not d.done]
+
+    found = {}
+    for d in detectors:
+        found.update(d.result())
+    return found
+
+def needs_sizes(detectors):
+    return any(d.needs in ("sizes", "checkout") for d in detectors)
+
+@detector
+class FileCountDetector(Detector):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def visit(self, entry):
+        self.count += 1
+
+    def result(self):
+        return {"files": self.count}
+
+    def from_index(self, index):
+        return {"files": len(index)}
+
+@detector
+class ReadmeDetector(Detector):
+    """
+    README counts only if:
     - File name is README or README.*
     - Located in repo root
-    - Has meaningful content
+    It has content if it holds meaningful text, and its sections are read
+    from the first README_SCAN_BYTES only.
     """
-    for f in files:
-        rel_path = os.path.relpath(f, TEMP_DIR)
-        name = os.path.basename(f).lower()
-
-        if os.sep in rel_path:
-            continue
 
-        if name == "readme" or name.startswith("readme."):
-            try:
-                with open(f, "rb") as bf:
-                    content = bf.read().decode(errors="ignore").strip()
+    needs = "contents"
 
-                if len(content) < 50:
-                    return False, False
+    def __init__(self):
+        super().__init__()
+        self.readme = False
+        self.content = False
+        self.sections = []
 
-                return True, True
+    def visit(self, entry):
+        if entry.depth != 1:
+            return
+        name = entry.path.lower()
 
+        if name == "readme" or name.startswith("readme."):
+            self.done = True
+            self.readme = True
+            try:
+                head = self.read(entry.path, README_SCAN_BYTES)
             except:
-                return False, False
+                return
+            self.content, self.sections = analyze_readme(head.decode(errors="ignore"))
+
+    def result(self):
+        return {
+            "readme": self.readme,
+            "readme_content": self.content,
+            "readme_sections": self.sections
+        }
+
+README_SCAN_BYTES = 64 * 1024
+
+README_SECTIONS = {
+    "install": ("install", "installation", "setup", "getting started", "quick start", "quickstart", "requirements"),
+    "usage": ("usage", "how to use", "example", "examples", "tutorial", "running"),
+    "license": ("license", "licence", "licensing"),
+    "contributing": ("contributing", "contribute", "development")
+}
+
+README_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+(.+?)\s*#*\s*$|^\s*<h[1-6][^>]*>(.+?)</h[1-6]>", re.IGNORECASE)
+README_UNDERLINE = re.compile(r"^\s*([=\-~^*+#])\1{2,}\s*$")
+README_BADGE = re.compile(
+    r"!\[[^\]]*\]\([^)]*(?:badge|shields\.io|travis-ci|codecov|coveralls)[^)]*\)"
+    r"|\.\. image:: \S*(?:badge|shields\.io)",
+    re.IGNORECASE
+)
+
+def analyze_readme(text):
+    """
+    Whether a README prefix has meaningful content and which of the
+    README_SECTIONS (plus "badges") it covers. Headings are recognised in
+    Markdown (ATX and setext), reStructuredText underline and HTML form.
+    """
+    found = set()
+    previous = ""
+    for line in text.splitlines():
+        title = None
+        m = README_HEADING.match(line)
+        if m:
+            title = m.group(1) or m.group(2)
+        elif README_UNDERLINE.match(line) and previous.strip():
+            title = previous
+        if title:
+            words = re.sub(r"[^a-z ]+", " ", title.lower()).strip()
+            for section, keys in README_SECTIONS.items():
+                if any(words == k or words.startswith(k + " ") or words.endswith(" " + k) for k in keys):
+                    found.add(section)
+        if "badges" not in found and README_BADGE.search(line):
+            found.add("badges")
+        previous = line
+
+    return len(text.strip()) >= 50, sorted(found)
+
+# Test conventions as globs over the repo-relative path, per language.
+# Directory globs end in "/**"; the rest match file names at any depth.
+# Matching is case-sensitive so "*Test.java" does not take Latest.java;
+# directory names spell out both cases of each letter so TESTS/ matches.
+TEST_CONVENTIONS = {
+    "any": (
+        "**/[Tt][Ee][Ss][Tt][Ss]/**", "**/[Tt][Ee][Ss][Tt]/**", "**/__[Tt][Ee][Ss][Tt][Ss]__/**",
+        "**/[Ss][Pp][Ee][Cc]/**", "**/[Ss][Pp][Ee][Cc][Ss]/**"
+    ),
+    "Python": ("test_*.py", "*_test.py", "conftest.py", "pytest.ini", "tox.ini", "noxfile.py"),
+    "JavaScript": (
+        "*.test.js", "*.spec.js", "*.test.jsx", "*.spec.jsx", "*.test.mjs", "*.spec.mjs",
+        "jest.config.*", "vitest.config.*", "karma.conf.js", ".mocharc.*", "mocha.opts",
+        "cypress.config.*", "playwright.config.*"
+    ),
+    "TypeScript": ("*.test.ts", "*.spec.ts", "*.test.tsx", "*.spec.tsx"),
+    "Go": ("*_test.go",),
+    "Rust": ("*_test.rs",),
+    # integration tests: FooIT.java, but not GIT.java
+    "Java": ("*Test.java", "*Tests.java", "*[a-z]IT.java"),
+    "Kotlin": ("*Test.kt", "*Tests.kt"),
+    "Scala": ("*Spec.scala", "*Test.scala", "*Suite.scala"),
+    "C#": ("*Test.cs", "*Tests.cs", "**/*.Tests/**"),
+    "C++": ("*_test.cc", "*_test.cpp", "*_unittest.cc", "*_unittest.cpp"),
+    "Ruby": ("*_spec.rb", "*_test.rb", ".rspec"),
+    "PHP": ("*Test.php", "phpunit.xml", "phpunit.xml.dist"),
+    "Swift": ("*Tests.swift",),
+    "Dart": ("*_test.dart",),
+    "Elixir": ("*_test.exs",)
+}
+
+def compile_globs(globs):
+    """
+    One regex matching a path against any of the globs. Globs that match
+    at any depth share a single "(?:.*/)?" and are split into directory
+    globs, tried at every level, and file name globs, tried on the last
+    component only; name globs starting with "*" share one "[^/]*". Adding
+    conventions adds alternatives rather than passes or backtracking.
+    """
+    anywhere = "^(?:.*/)?"
+    anchored = []
+    dirs = []
+    names = []
+    suffixes = []
+    for glob in globs:
+        pattern = glob_regex(glob).pattern
+        if not pattern.startswith(anywhere):
+            anchored.append(pattern[1:])
+        elif pattern.endswith("/.*$"):
+            dirs.append(pattern[len(anywhere):-len("/.*$")])
+        elif pattern.startswith(anywhere + "[^/]*"):
+            suffixes.append(pattern[len(anywhere + "[^/]*"):-1])
+        else:
+            names.append(pattern[len(anywhere):-1])
+
+    if suffixes:
+        names.append("[^/]*(?:" + "|".join(suffixes) + ")")
+    relative = []
+    if dirs:
+        relative.append("(?:" + "|".join(dirs) + ")/")
+    if names:
+        relative.append("(?![^/]*/)(?:" + "|".join(names) + ")$")
+    alternatives = anchored + ["(?:.*/)?(?:" + "|".join(relative) + ")"] if relative else anchored
+    return re.compile("^(?:" + "|".join(alternatives) + ")")
+
+TEST_PATTERN = compile_globs(chain.from_iterable(TEST_CONVENTIONS.values()))
+
+@detector
+class TestsDetector(Detector):
+    def visit(self, entry):
+        if TEST_PATTERN.match(entry.path):
+            self.done = True
+
+    def result(self):
+        return {"tests": self.done}
+
+    def from_index(self, index):
+        return {"tests": detect_tests_columnar(index)}
+
+@detector
+class StructureDetector(Detector):
+    # each role is met by any one group of directory globs that all exist
+    LAYOUTS = {
+        "src": (("src",), ("packages/*/src",), ("cmd", "pkg")),
+        "tests": (("tests",),),
+        "docs": (("docs",),)
+    }
 
-    return False, False
+    def __init__(self):
+        super().__init__()
+        self.trie = PathTrie()
+        self.layout = 0
+
+    def score(self):
+        return self.layout + (len(self.trie) > 10)
+
+    def visit(self, entry):
+        if self.trie.insert(entry.parts[:-1]):
+            self.layout = layout_score(self.trie, self.LAYOUTS)
+        # the score only goes up, and 3 is already "clean"
+        self.done = self.score() >= 3
+
+    def result(self):
+        return {"structure": structure_label(self.score())}
+
+    def from_index(self, index):
+        return {"structure": detect_structure_columnar(index)}
+
+# Only languages a project is written in; docs and data formats would
+# otherwise outweigh the code in most repos.
+LANGUAGE_EXTENSIONS = {
+    ".py": "Python", ".pyx": "Python", ".pyi": "Python",
+    ".js": "JavaScript", ".mjs": "JavaScript", ".cjs": "JavaScript", ".jsx": "JavaScript",
+    ".ts": "TypeScript", ".tsx": "TypeScript",
+    ".go": "Go", ".rs": "Rust", ".java": "Java", ".kt": "Kotlin", ".kts": "Kotlin",
+    ".scala": "Scala", ".groovy": "Groovy", ".clj": "Clojure",
+    ".c": "C", ".h": "C", ".cc": "C++", ".cpp": "C++", ".cxx": "C++", ".hpp": "C++", ".hh": "C++",
+    ".cs": "C#", ".fs": "F#", ".m": "Objective-C", ".mm": "Objective-C", ".swift": "Swift",
+    ".rb": "Ruby", ".php": "PHP", ".pl": "Perl", ".pm": "Perl", ".lua": "Lua", ".r": "R",
+    ".dart": "Dart", ".ex": "Elixir", ".exs": "Elixir", ".erl": "Erlang", ".hs": "Haskell",
+    ".ml": "OCaml", ".jl": "Julia", ".zig": "Zig", ".nim": "Nim", ".vue": "Vue", ".svelte": "Svelte",
+    ".html": "HTML", ".htm": "HTML", ".css": "CSS", ".scss": "SCSS", ".sass": "SCSS", ".less": "Less",
+    ".sh": "Shell", ".bash": "Shell", ".zsh": "Shell", ".ps1": "PowerShell",
+    ".sql": "SQL", ".ipynb": "Jupyter Notebook", ".tf": "HCL"
+}
+LANGUAGE_FILENAMES = {
+    "makefile": "Makefile", "gnumakefile": "Makefile",
+    "dockerfile": "Dockerfile", "cmakelists.txt": "CMake",
+    "rakefile": "Ruby", "gemfile": "Ruby", "build.gradle": "Groovy"
+}
+
+def file_language(name):
+    name = name.lower()
+    return LANGUAGE_FILENAMES.get(name) or LANGUAGE_EXTENSIONS.get(os.path.splitext(name)[1])
+
+def language_breakdown(weights):
+    """
+    {language: percent}, largest first, from {language: weight}. Languages
+    with no weight are left out.
+    """
+    total = sum(weights.values())
+    if not total:
+        return {}
+    ranked = sorted(((lang, w) for lang, w in weights.items() if w), key=lambda kv: (-kv[1], kv[0]))
+    return {lang: round(100 * w / total, 1) for lang, w in ranked}
+
+@detector
+class LanguageDetector(Detector):
+    """
+    Share of each language in the repo by bytes. Listings without sizes
+    (blobless trees report 0) fall back to weighting by file count.
+    """
 
-def detect_tests(files):
-    TEST_DIRS = {"tests", "__tests__", "test", "spec"}
-    TEST_FILE_SUFFIXES = (
-        "_test.py", "test_.py",
-        ".test.js", ".spec.js",
-        ".test.ts", ".spec.ts",
-        "_test.go", "_test.rs"
-    )
-    TEST_CONFIGS = {
-        "pytest.ini",
-        "tox.ini",
-        "jest.config.js",
-        "jest.config.ts",
-        "vitest.config.ts",
-        "mocha.opts",
-        "phpunit.xml"
-    }
+    needs = "sizes"
 
-    for f in files:
-        rel = os.path.relpath(f, TEMP_DIR)
-        parts = rel.split(os.sep)
-        name = os.path.basename(f).lower()
+    def __init__(self):
+        super().__init__()
+        self.bytes = {}
+        self.files = {}
 
-        if any(part.lower() in TEST_DIRS for part in parts[:-1]):
-            return True
+    def visit(self, entry):
+        lang = file_language(entry.parts[-1])
+        if lang:
+            self.bytes[lang] = self.bytes.get(lang, 0) + entry.size
+            self.files[lang] = self.files.get(lang, 0) + 1
 
-        if name.endswith(TEST_FILE_SUFFIXES):
-            return True
+    def result(self):
+        weights = self.bytes if any(self.bytes.values()) else self.files
+        return {"languages": language_breakdown(weights)}
 
-        if name in TEST_CONFIGS:
-            return True
+    def from_index(self, index):
+        return {"languages": detect_languages_columnar(index)}
 
-    return False
+loc_pool = None
+loc_pool_lock = threading.Lock()
 
+def loc_executor():
+    """
+    The shared counting pool. Workers come from a forkserver (spawn where
+    there is none, as on Windows) rather than a fork of this process,
+    which by now runs stage, walk and reaper threads that may hold locks a
+    forked child would inherit locked. They only need the loc module.
+    """
+    global loc_pool
+    with loc_pool_lock:
+        if loc_pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            loc_pool = ProcessPoolExecutor(
+                max_workers=LOC_WORKERS,
+                mp_context=multiprocessing.get_context(method)
+            )
+        return loc_pool
+
+def discard_loc_pool(pool):
+    """Drops a broken pool so the next analysis starts a fresh one."""
+    global loc_pool
+    with loc_pool_lock:
+        if loc_pool is pool:
+            loc_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def merge_loc(loc, part):
+    """Folds a count_shard result into the totals of a loc report."""
+    for (top, lang), counts in part.items():
+        for group in (loc, loc["languages"].setdefault(lang, {}), loc["dirs"].setdefault(top, {})):
+            for key, n in zip(("code", "comment", "blank"), counts):
+                group[key] = group.get(key, 0) + n
+
+@detector
+class LocDetector(Detector):
+    """
+    Lines of code, comments and blanks, overall and per language and
+    top-level directory. Counting needs the files on disk, so listings
+    without a working tree (the API backend, blobless clones) report None.
+
+    Small checkouts are counted inline. Once LOC_PARALLEL_MIN_FILES paths
+    have been seen, every LOC_SHARD_FILES paths go to the process pool as
+    the walk produces them, with at most 2 * LOC_WORKERS shards in flight,
+    so counting overlaps the walk and memory stays bounded.
+    """
 
-def detect_structure(files):
-    dirs = set()
-    for f in files:
-        parts = f.replace(TEMP_DIR, "").split(os.sep)
-        if len(parts) > 2:
-            dirs.add(parts[1])
+    needs = "checkout"
+
+    def __init__(self, workers=LOC_WORKERS):
+        super().__init__()
+        self.workers = workers
+        self.files = []
+        self.pending = deque()
+        self.parallel = False
+        self.loc = {"code": 0, "comment": 0, "blank": 0, "languages": {}, "dirs": {}}
+
+    def collect(self):
+        pool, future = self.pending.popleft()
+        try:
+            merge_loc(self.loc, future.result())
+        except BrokenProcessPool:
+            discard_loc_pool(pool)
+            raise
+
+    def submit(self, shard):
+        if len(self.pending) >= self.workers * 2:
+            self.collect()
+        pool = loc_executor()
+        try:
+            self.pending.append((pool, pool.submit(count_shard, self.checkout, shard)))
+        except BrokenProcessPool:
+            discard_loc_pool(pool)
+            raise
+
+    def visit(self, entry):
+        if self.checkout is None:
+            self.done = True
+            return
+        lang = file_language(entry.parts[-1])
+        if lang not in COMMENT_SYNTAX or entry.kind != "file":
+            return
+        top = entry.parts[0] if entry.depth > 1 else "."
+        self.files.append((entry.path, lang, top))
+
+        if self.parallel:
+            if len(self.files) >= LOC_SHARD_FILES:
+                self.submit(self.files)
+                self.files = []
+        elif self.workers > 1 and len(self.files) >= LOC_PARALLEL_MIN_FILES:
+            self.parallel = True
+            for i in range(0, len(self.files), LOC_SHARD_FILES):
+                self.submit(self.files[i:i + LOC_SHARD_FILES])
+            self.files = []
+
+    def result(self):
+        if self.checkout is None:
+            return {"loc": None}
+        if self.files:
+            merge_loc(self.loc, count_shard(self.checkout, self.files))
+            self.files = []
+        while self.pending:
+            self.collect()
+        return {"loc": self.loc}
+
+def content_hash(path):
+    """
+    Fast 64-bit digest of a file: xxh3 when xxhash is installed, an
+    8-byte BLAKE2b otherwise. Both release the GIL on large buffers, and
+    64 bits keep collisions negligible among same-size files.
+    """
+    digest = xxhash.xxh3_64() if xxhash is not None else hashlib.blake2b(digest_size=8)
+    with open(path, "rb") as fh:
+        while True:
+            chunk = fh.read(HASH_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.digest()
+
+def find_duplicates(root, by_size, threads=HASH_THREADS):
+    """
+    Groups of identical files among {size: [paths]}, largest waste first.
+    Only sizes shared by two or more files are hashed, on a thread pool,
+    and files are keyed by (size, digest) so a digest collision needs
+    equal sizes too. Files that cannot be read are left out.
+    """
+    candidates = [(size, path) for size, paths in by_size.items() if len(paths) > 1 for path in paths]
+
+    def digest(candidate):
+        size, path = candidate
+        try:
+            return size, content_hash(os.path.join(root, *path.split("/")))
+        except OSError:
+            return None
+
+    groups = {}
+    with ThreadPoolExecutor(max_workers=max(threads, 1), thread_name_prefix="hash") as pool:
+        for (size, path), key in zip(candidates, pool.map(digest, candidates)):
+            if key is not None:
+                groups.setdefault(key, []).append(path)
+
+    duplicates = sorted(
+        ((size * (len(paths) - 1), sorted(paths)) for (size, _), paths in groups.items() if len(paths) > 1),
+        key=lambda g: (-g[0], g[1])
+    )
+    return {
+        "groups": [paths for _, paths in duplicates[:DUPLICATE_MAX_GROUPS]],
+        "files": sum(len(paths) - 1 for _, paths in duplicates),
+        "wasted_bytes": sum(wasted for wasted, _ in duplicates)
+    }
+
+@detector
+class DuplicateDetector(Detector):
+    """
+    Files checked in more than once, such as copied third-party code.
+    Vendored trees the walk prunes are included, since that is where such
+    copies usually live. Hashing needs the files on disk, so listings
+    without a working tree report None. Files under DUPLICATE_MIN_BYTES
+    are ignored.
+    """
 
-    score = sum([
-        "src" in dirs,
-        "tests" in dirs,
-        "docs" in dirs,
-        len(files) > 10
-    ])
+    needs = "checkout"
+    vendored = True
+
+    def __init__(self):
+        super().__init__()
+        self.by_size = {}
+
+    def visit(self, entry):
+        if self.checkout is None:
+            self.done = True
+        else:
+            self.visit_vendored(entry)
+
+    def visit_vendored(self, entry):
+        # may run before self.checkout is set; result() checks it
+        if entry.kind == "file" and entry.size >= DUPLICATE_MIN_BYTES:
+            self.by_size.setdefault(entry.size, []).append(entry.path)
+
+    def result(self):
+        if self.checkout is None:
+            return {"duplicates": None}
+        return {"duplicates": find_duplicates(self.checkout, self.by_size)}
+
+def layout_score(trie, layouts):
+    return sum(
+        any(all(trie.exists(p) for p in group) for group in groups)
+        for groups in layouts.values()
+    )
 
+def structure_label(score):
     if score >= 3:
         return "clean"
     elif score == 2:
         return "moderate"
     return "basic"
 
-def build_analysis(url):
+# -------------------- COLUMNAR INDEX --------------------
+
+class ColumnarIndex:
+    """
+    A file listing stored as NumPy columns: interned parent directory,
+    file name and extension ids, size and flags. Directory and name
+    predicates are evaluated once per distinct value and broadcast through
+    the id columns, so the language and test queries cost a vectorized
+    pass instead of a Python loop over every path. Structure is read from
+    the distinct directories alone.
+    """
+
+    FLAG_LINK = 1
+
+    def __init__(self):
+        self.dir_ids = {(): 0}
+        self.dirs = [()]
+        self.name_ids = {}
+        self.names = []
+        self.ext_ids = {}
+        self.exts = []
+        self._dir = array("i")
+        self._name = array("i")
+        self._ext = array("i")
+        self._size = array("q")
+        self._flags = array("B")
+
+    @staticmethod
+    def _intern(ids, values, key):
+        i = ids.get(key)
+        if i is None:
+            i = ids[key] = len(values)
+            values.append(key)
+        return i
+
+    def add(self, entry):
+        name = entry.parts[-1]
+        self._dir.append(self._intern(self.dir_ids, self.dirs, entry.parts[:-1]))
+        self._name.append(self._intern(self.name_ids, self.names, name))
+        self._ext.append(self._intern(self.ext_ids, self.exts, os.path.splitext(name)[1].lower()))
+        self._size.append(entry.size)
+        self._flags.append(self.FLAG_LINK if entry.kind == "link" else 0)
+
+    def freeze(self):
+        self.dir_id = np.frombuffer(self._dir, dtype=np.intc)
+        self.name_id = np.frombuffer(self._name, dtype=np.intc)
+        self.ext_id = np.frombuffer(self._ext, dtype=np.intc)
+        self.size = np.frombuffer(self._size, dtype=np.int64)
+        self.flags = np.frombuffer(self._flags, dtype=np.uint8)
+        return self
+
+    @classmethod
+    def from_entries(cls, files):
+        index = cls()
+        for entry in files:
+            index.add(entry)
+        return index.freeze()
+
+    def __len__(self):
+        return len(self._dir)
+
+    def dir_mask(self, predicate):
+        """Per-file mask of files whose parent directory parts satisfy predicate."""
+        per_dir = np.fromiter((predicate(d) for d in self.dirs), dtype=bool, count=len(self.dirs))
+        return per_dir[self.dir_id]
+
+    def name_mask(self, predicate):
+        per_name = np.fromiter((predicate(n) for n in self.names), dtype=bool, count=len(self.names))
+        return per_name[self.name_id]
+
+    def entries(self):
+        for i in range(len(self)):
+            parts = self.dirs[self._dir[i]] + (self.names[self._name[i]],)
+            kind = "link" if self._flags[i] & self.FLAG_LINK else "file"
+            yield FileEntry("/".join(parts), parts, len(parts), self._size[i], kind)
+
+def detect_structure_columnar(index):
+    """The layout from the interned directories, one insert per distinct one."""
+    trie = PathTrie()
+    for d in index.dirs:
+        trie.insert(d)
+    score = layout_score(trie, StructureDetector.LAYOUTS) + (len(index) > 10)
+    return structure_label(score)
+
+def detect_languages_columnar(index):
+    """
+    One bincount over per-file language ids, looked up through tables
+    built once per distinct extension and file name.
+    """
+    langs = sorted(set(LANGUAGE_EXTENSIONS.values()) | set(LANGUAGE_FILENAMES.values()))
+    lang_ids = {lang: i for i, lang in enumerate(langs)}
+    by_ext = np.array([lang_ids.get(LANGUAGE_EXTENSIONS.get(e), -1) for e in index.exts] or [-1], dtype=np.intc)
+    by_name = np.array([lang_ids.get(LANGUAGE_FILENAMES.get(n.lower()), -1) for n in index.names] or [-1], dtype=np.intc)
+
+    lang = by_name[index.name_id]
+    lang = np.where(lang >= 0, lang, by_ext[index.ext_id])
+    known = lang >= 0
+    weights = index.size[known]
+    if not weights.any():
+        weights = None
+    totals = np.bincount(lang[known], weights=weights, minlength=len(langs))
+    return language_breakdown({lang: int(w) for lang, w in zip(langs, totals) if w})
+
+def detect_tests_columnar(index):
+    """
+    TEST_PATTERN run once per distinct directory (as "dir/") and once per
+    distinct file name instead of once per path; its directory and file
+    name conventions never span both.
+    """
+    if index.dir_mask(lambda parts: TEST_PATTERN.match("/".join(parts) + "/") is not None).any():
+        return True
+    return bool(index.name_mask(lambda n: TEST_PATTERN.match(n) is not None).any())
+
+# -------------------- ANALYSIS PIPELINE --------------------
+
+def make_workdir():
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    return tempfile.mkdtemp(prefix=f"analysis-{os.getpid()}-", dir=TEMP_DIR)
+
+def api_reader(owner, repo, tree):
+    def read(path, limit=None):
+        if path not in tree:
+            raise KeyError(path)
+        return github_file(owner, repo, path, limit)
+
+    return read
+
+def tree_entries(tree):
+    for path, size in tree.items():
+        yield file_entry(path, size)
+
+def list_files(url, root, backend=ANALYSIS_BACKEND, sizes=True, pruner=None):
+    """
+    The repo's file entries, a reader for their contents by path, the
+    directory they are checked out in (None without a working tree) and
+    the clone budget that was hit, if any. The API backend never touches
+    the disk; anything it cannot serve (a truncated tree, an API error)
+    falls back to a clone. A clone that goes over budget falls back to
+    whatever tree listing the API can give, even a truncated one.
+    """
     owner, repo = parse_repo(url)
-    info = github_repo_info(owner, repo)
-    commits = github_commit_count(owner, repo)
+    tree = None
+    if backend == "api":
+        try:
+            tree, truncated = github_tree(owner, repo)
+        except (GitHubError, requests.RequestException) as e:
+            app.logger.info("tree API unavailable for %s/%s: %s", owner, repo, e)
+        if tree is not None and not truncated:
+            return tree_entries(tree), api_reader(owner, repo, tree), None, None
+
+    try:
+        files, read, checkout = checkout_files(url, root, sizes=sizes, pruner=pruner)
+        return files, read, checkout, None
+    except CloneBudgetExceeded as e:
+        app.logger.warning("clone of %s/%s stopped: %s", owner, repo, e)
+        if tree is None:
+            tree, _ = github_tree(owner, repo)
+        return tree_entries(tree), api_reader(owner, repo, tree), None, e.budget
+
+def checkout_files(url, root, mode=CLONE_MODE, sizes=True, pruner=None):
+    if mirrors is not None:
+        git_dir = mirrors.get(url, mode)
+        if mode != "blobless":
+            checkout_mirror(git_dir, root)
+    else:
+        git_dir = root
+        clone_repo(url, root, mode)
 
-    clone_repo(url)
-    files = analyze_files()
+    if mode == "blobless":
+        # pin the commit so a concurrent mirror refresh cannot mix trees
+        rev = Repo(git_dir).git.rev_parse("HEAD")
+        return iter_tree(git_dir, rev), blob_reader(git_dir, rev), None
+    return iter_files(root, sizes, pruner), disk_reader(root), root
 
-    readme, readme_content = detect_readme(files)
+def scan_repo(url, root):
+    """
+    Lists the repo and runs every registered detector over the listing in
+    one pass, returning the analysis keys they produce. Listings are lazy,
+    so the ignore rules are loaded before the first entry is produced.
+    """
+    detectors = [cls() for cls in DETECTORS]
+    pruner = Pruner()
+    files, read, checkout, clone_budget = list_files(url, root, sizes=needs_sizes(detectors), pruner=pruner)
+
+    # vendored trees are only worth walking when a detector can read them
+    # from disk; the walk is lazy, so the hook is in place before it starts
+    vendored = [d for d in detectors if d.vendored]
+    if vendored and checkout is not None:
+        def on_vendored(entry):
+            for d in vendored:
+                d.visit_vendored(entry)
+        pruner.on_vendored = on_vendored
+    pruner.load_rules(read)
+    files = pruner.filter(files)
+
+    if COLUMNAR_INDEX and np is not None:
+        index = ColumnarIndex.from_entries(files)
+        found = {}
+        pending = []
+        for d in detectors:
+            result = d.from_index(index)
+            if result is None:
+                pending.append(d)
+            else:
+                found.update(result)
+        found.update(run_detectors(index.entries(), pending, read, checkout))
+    else:
+        found = run_detectors(files, detectors, read, checkout)
+    found["clone_budget"] = clone_budget
+    found["skipped"] = pruner.skipped()
+    return found
+
+def scan_defaults():
+    found = run_detectors([], [cls() for cls in DETECTORS])
+    found["clone_budget"] = None
+    found["skipped"] = 0
+    return found
+
+# Shared by all requests so a stage that overruns the deadline keeps its
+# thread without blocking the request that gave up on it.
+stage_pool = ThreadPoolExecutor(max_workers=WORKERS * 3, thread_name_prefix="stage")
+
+def run_stages(stages, timeout):
+    """
+    Runs {name: (fn, args, default)} concurrently and returns the results
+    plus the names of stages that failed or missed the deadline; those get
+    their default instead of failing the whole analysis.
+    """
+    futures = {name: stage_pool.submit(fn, *args) for name, (fn, args, _) in stages.items()}
+    done, _ = wait(futures.values(), timeout=timeout)
+
+    results = {}
+    degraded = []
+    for name, future in futures.items():
+        if future in done and future.exception() is None:
+            results[name] = future.result()
+            continue
+        future.cancel()
+        if future in done:
+            app.logger.warning("analysis stage %s failed: %s", name, future.exception())
+        else:
+            app.logger.warning("analysis stage %s missed the deadline", name)
+        results[name] = stages[name][2]
+        degraded.append(name)
+    return results, degraded
 
+def build_analysis(url):
+    owner, repo = parse_repo(url)
+    root = make_workdir()
+
+    try:
+        results, degraded = run_stages({
+            "repo_info": (github_repo_info, (owner, repo), {}),
+            "commits": (github_commit_count, (owner, repo), None),
+            "files": (scan_repo, (url, root), scan_defaults())
+        }, timeout=ANALYSIS_DEADLINE)
+    finally:
+        close_cat_file(root)
+        reaper.reap(root)
+
+    if github.cache is not None:
+        app.logger.info("analysed %s/%s, GitHub cache %s", owner, repo, github.cache.stats())
+
+    info = results["repo_info"]
+    # the API leaves language empty for some repos and is absent when
+    # degraded; the local breakdown covers both
+    local = next(iter(results["files"]["languages"]), None)
     return {
-        "files": len(files),
-        "structure": detect_structure(files),
-        "readme": readme,
-        "readme_content": readme_content,
-        "tests": detect_tests(files),
-        "commits": commits,
+        **results["files"],
+        "commits": results["commits"],
         "stars": info.get("stargazers_count", 0),
-        "language": info.get("language", "Unknown")
+        "language": info.get("language") or local or "Unknown",
+        "degraded": degraded
     }
 
+# -------------------- RESULT CACHE --------------------
+
+def remote_head(url):
+    try:
+        out = subprocess.run(
+            ["git", "ls-remote", url, "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=GITHUB_TIMEOUT,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+        )
+    except subprocess.TimeoutExpired:
+        return None
+    if out.returncode or not out.stdout:
+        return None
+    return out.stdout.split()[0]
+
+class ResultCache:
+    """
+    Finished analyses keyed by (repo, HEAD sha, SCORING_VERSION, mode): a
+    small in-memory LRU in front of a SQLite table that survives restarts
+    and is shared by every worker process on the box. The mode is the
+    backend and clone mode, which decide what a listing can report (sizes,
+    lines of code, duplicates), so deployments never serve each other's
+    results.
+    """
+
+    def __init__(self, path, size=RESULT_CACHE_SIZE):
+        self.path = path
+        self.size = size
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._db() as db:
+            db.execute("DROP TABLE IF EXISTS results")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                " repo TEXT, sha TEXT, version INTEGER, mode TEXT, analysis TEXT, created REAL,"
+                " PRIMARY KEY (repo, sha, version, mode))"
+            )
+
+    def _db(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _remember(self, key, analysis):
+        with self.lock:
+            self.memory[key] = analysis
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.size:
+                self.memory.popitem(last=False)
+
+    def get(self, key):
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return dict(self.memory[key])
+
+        with self._db() as db:
+            row = db.execute(
+                "SELECT analysis FROM analyses WHERE repo = ? AND sha = ? AND version = ? AND mode = ?",
+                key
+            ).fetchone()
+        if row is None:
+            return None
+        analysis = json.loads(row[0])
+        self._remember(key, analysis)
+        return dict(analysis)
+
+    def put(self, key, analysis):
+        with self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, json.dumps(analysis), time.time())
+            )
+        self._remember(key, dict(analysis))
+
+# set up by init()
+results = None
+
+def cached_analysis(url):
+    """
+    build_analysis behind the result cache. A hit only costs an ls-remote
+    plus a (usually 304) repo info call to keep stars and language fresh.
+    Degraded analyses are never stored.
+    """
+    sha = remote_head(url)
+    key = (canonical_repo(url), sha, SCORING_VERSION, f"{ANALYSIS_BACKEND}/{CLONE_MODE}")
+
+    if sha:
+        analysis = results.get(key)
+        if analysis is not None:
+            try:
+                info = github_repo_info(*parse_repo(url))
+            except (GitHubError, requests.RequestException):
+                info = {}
+            if info:
+                analysis["stars"] = info.get("stargazers_count", 0)
+                analysis["language"] = info.get("language") or next(iter(analysis["languages"]), None) or "Unknown"
+            return analysis
+
+    analysis = build_analysis(url)
+    if sha and not analysis["degraded"]:
+        results.put(key, analysis)
+    return analysis
+
 # -------------------- SCORING + FEEDBACK --------------------
 
 def fallback_feedback(a):
+    """
+    Summary, roadmap and score for an analysis. Stages in a["degraded"]
+    only hold defaults, so their terms are left out rather than scored as
+    findings; without the file listing only GitHub data is scored. Lines
+    of code and duplicates are only known for full checkouts, so they feed
+    the summary and roadmap but never the score.
+    """
     score = 40
     roadmap = []
+    listed = "files" not in a["degraded"]
 
-    if a["structure"] == "clean":
+    if not listed:
+        pass
+    elif a["structure"] == "clean":
         score += 15
     elif a["structure"] == "moderate":
         score += 8
     else:
         roadmap.append("Improve project structure (src/, tests/, docs/)")
 
-    if a["readme"]:
+    sections = a["readme_sections"]
+    if not listed:
+        pass
+    elif a["readme"]:
         score += 10
         if not a["readme_content"]:
             roadmap.append("Expand README with setup, usage, and examples")
+        else:
+            missing = [s for s in ("install", "usage") if s not in sections]
+            if missing:
+                roadmap.append(f"Add {' and '.join(missing)} instructions to the README")
+            else:
+                score += 5
+            if "license" not in sections:
+                roadmap.append("State the project's license in the README")
     else:
-        roadmap.append("Add a comprehensive README")
-    if not a["readme"]:
         roadmap.append("Add a README with project overview, setup instructions, and usage examples")
-    else:
-      if not a["readme_content"]:
-        roadmap.append("Improve README with clearer documentation and examples")
-
 
-    if a["tests"]:
+    if not listed:
+        pass
+    elif a["tests"]:
         score += 15
     else:
         roadmap.append("Add unit and integration tests")
 
-    if a["commits"] > 50:
+    if a["commits"] is None:
+        pass
+    elif a["commits"] > 50:
         score += 10
     elif a["commits"] < 10:
         roadmap.append("Commit more frequently with meaningful messages")
@@ -343,13 +2346,33 @@ def fallback_feedback(a):
     if a["stars"] > 20:
         score += 5
 
-    summary = (
-        f"{a['structure'].capitalize()} {a['language']} project "
-        f"{'with' if a['readme'] else 'without'} documentation "
-        f"and {'with' if a['tests'] else 'without'} tests."
-    )
+    duplicates = a["duplicates"]
+    if duplicates and duplicates["files"]:
+        roadmap.append(
+            f"Remove {duplicates['files']} duplicated file{'s' if duplicates['files'] != 1 else ''} "
+            f"({duplicates['wasted_bytes'] // 1024:,} KB), such as copied libraries that could be dependencies"
+        )
+
+    loc = a["loc"]
+    size = ""
+    if loc and loc["code"]:
+        size = f"({loc['code']:,} lines of code) "
+        if loc["comment"] / (loc["code"] + loc["comment"]) < 0.1:
+            roadmap.append("Comment the non-obvious parts of the code")
+
+    if listed:
+        summary = (
+            f"{a['structure'].capitalize()} {a['language']} project {size}"
+            f"{'with' if a['readme'] else 'without'} documentation "
+            f"and {'with' if a['tests'] else 'without'} tests."
+        )
+    else:
+        summary = (
+            f"{a['language']} project whose files could not be read, "
+            f"so structure, documentation and tests are not scored."
+        )
 
-    if not roadmap:
+    if not roadmap and listed:
         roadmap.append("Prepare the project for open-source contributions")
 
     return summary, roadmap[:7], min(score, 100)
@@ -363,19 +2386,42 @@ def home():
 @app.route("/analyze", methods=["POST"])
 def analyze():
     url = request.form.get("repo_url")
-    analysis = build_analysis(url)
+    analysis = cached_analysis(url)
     summary, roadmap, score = fallback_feedback(analysis)
-    safe_delete(TEMP_DIR)
 
     return render_template_string(
         RESULT_HTML,
         summary=summary,
         roadmap=roadmap,
-        score=score
+        score=score,
+        degraded=analysis["degraded"]
     )
 
+@app.route("/status")
+def status():
+    return jsonify(http_cache=github.cache.stats() if github.cache is not None else None)
+
+# -------------------- STARTUP --------------------
+
+def init():
+    """
+    Startup work for a serving process: queues what dead workers left in
+    the temp and mirror dirs and opens the on-disk caches and stores.
+    """
+    global mirrors, results
+    reaper.sweep(TEMP_DIR)
+    github.cache = GitHubCache(os.path.join(CACHE_DIR, "http"))
+    mirrors = MirrorStore(MIRROR_DIR, MIRROR_QUOTA_BYTES) if MIRROR_QUOTA_BYTES > 0 else None
+    reaper.sweep(MIRROR_DIR)
+    results = ResultCache(os.path.join(CACHE_DIR, "results.sqlite"))
+
+# Counting pool workers started with spawn or forkserver re-run this file
+# as __mp_main__; they must not sweep or open the stores a second time.
+if __name__ != "__mp_main__":
+    init()
+
 if __name__ == "__main__":
     print("RepoLens running on http://localhost:8000")
-    app.run(port=8000, debug=True)
+    app.run(port=8000, debug=True, threaded=True)
 
 
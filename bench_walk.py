@@ -0,0 +1,25 @@
+"""
+Times the file walk over a checkout at several thread counts:
+
+    python bench_walk.py <directory> [runs]
+"""
+import sys
+import time
+
+from app import iter_files
+
+def main():
+    root = sys.argv[1]
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    for threads in (1, 2, 4, 8, 16):
+        best = None
+        for _ in range(runs):
+            start = time.perf_counter()
+            count = sum(1 for _ in iter_files(root, threads=threads))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{threads:>2} threads: {count} files in {best:.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Line counting for RepoLens: code, comment and blank lines per file, with
+each language's comment syntax. Kept apart from app.py and free of
+import-time side effects, because the counting pool's worker processes
+import it.
+"""
+import mmap
+import os
+import re
+from itertools import chain
+from operator import methodcaller
+
+LOC_MAX_FILE_BYTES = 8 * 1024 * 1024
+LOC_BINARY_PROBE = 8192
+
+# line comment prefixes and (start, end) block delimiters per language
+C_COMMENTS = (("//",), (("/*", "*/"),))
+HASH_COMMENTS = (("#",), ())
+COMMENT_SYNTAX = {
+    "Python": (("#",), (('"""', '"""'), ("'''", "'''"))),
+    "JavaScript": C_COMMENTS, "TypeScript": C_COMMENTS, "Go": C_COMMENTS,
+    "Rust": C_COMMENTS, "Java": C_COMMENTS, "Kotlin": C_COMMENTS,
+    "Scala": C_COMMENTS, "Groovy": C_COMMENTS, "C": C_COMMENTS, "C++": C_COMMENTS,
+    "C#": C_COMMENTS, "F#": (("//",), (("(*", "*)"),)), "Objective-C": C_COMMENTS,
+    "Swift": C_COMMENTS, "Dart": C_COMMENTS, "Zig": (("//",), ()),
+    "PHP": (("//", "#"), (("/*", "*/"),)), "CSS": ((), (("/*", "*/"),)),
+    "SCSS": C_COMMENTS, "Less": C_COMMENTS, "Vue": (("//",), (("<!--", "-->"), ("/*", "*/"))),
+    "Svelte": (("//",), (("<!--", "-->"), ("/*", "*/"))), "HTML": ((), (("<!--", "-->"),)),
+    "Ruby": (("#",), (("=begin", "=end"),)), "Perl": (("#",), (("=pod", "=cut"),)),
+    "Shell": HASH_COMMENTS, "PowerShell": (("#",), (("<#", "#>"),)), "R": HASH_COMMENTS,
+    "Elixir": HASH_COMMENTS, "Julia": (("#",), (("#=", "=#"),)), "Nim": HASH_COMMENTS,
+    "Makefile": HASH_COMMENTS, "Dockerfile": HASH_COMMENTS, "CMake": HASH_COMMENTS,
+    "HCL": (("#", "//"), (("/*", "*/"),)), "Lua": (("--",), (("--[[", "]]"),)),
+    "SQL": (("--",), (("/*", "*/"),)), "Haskell": (("--",), (("{-", "-}"),)),
+    "OCaml": ((), (("(*", "*)"),)), "Erlang": (("%",), ()), "Clojure": ((";",), ())
+}
+
+# Triple-quoted strings in these languages are comments only as
+# docstrings; any other string is code.
+DOCSTRING_LANGUAGES = {"Python"}
+PY_DEF_HEADER = re.compile(
+    rb"[ \t]*(?:async[ \t]+)?(?:def|class)[ \t]+\w+[ \t]*"
+    rb"(?:\((?:[^()]|\([^()]*\))*\))?[^:\n]*:[ \t]*(?:#[^\n]*)?\s*\Z"
+)
+PY_HEADER_WINDOW = 2048
+
+def comment_rules(syntax, docstrings=False):
+    """
+    Bytes line prefixes, a regex for a block comment opening a line and
+    the closing delimiter of each opener. The regex matches from the
+    preceding newline, which lets re search for that literal instead of
+    trying every position; the file's first line is checked separately.
+    With `docstrings` the blocks are string quotes, found anywhere.
+    """
+    line_prefixes, blocks = syntax
+    closers = {start.encode(): end.encode() for start, end in blocks}
+    opener = None
+    if closers:
+        # longest first so "--[[" wins over a "--" line comment
+        starts = b"|".join(re.escape(s) for s in sorted(closers, key=len, reverse=True))
+        opener = re.compile(starts if docstrings else rb"\n[ \t]*(" + starts + rb")")
+    return tuple(p.encode() for p in line_prefixes), opener, closers, docstrings
+
+COMMENT_RULES = {
+    lang: comment_rules(syntax, lang in DOCSTRING_LANGUAGES)
+    for lang, syntax in COMMENT_SYNTAX.items()
+}
+
+def count_plain(data, prefixes, counts):
+    stripped = list(map(bytes.strip, data.splitlines()))
+    blank = stripped.count(b"")
+    comment = sum(map(methodcaller("startswith", prefixes), stripped)) if prefixes else 0
+    counts[0] += len(stripped) - blank - comment
+    counts[1] += comment
+    counts[2] += blank
+
+def line_end(data, pos):
+    """Offset just past the line holding pos; the end of data if pos is -1."""
+    eol = -1 if pos == -1 else data.find(b"\n", pos)
+    return len(data) if eol == -1 else eol + 1
+
+def block_spans(data, opener, closers):
+    first = opener.match(b"\n" + data[:256])
+    found = ((0, first.end() - 1, first.group(1)),) if first else ()
+    later = ((m.start() + 1, m.end(), m.group(1)) for m in opener.finditer(data))
+    pos = 0
+    for start, end, token in chain(found, later):
+        if start < pos:
+            continue
+        pos = line_end(data, data.find(closers[token], end))
+        yield start, pos, True
+
+def is_docstring(data, line_start, quote):
+    """
+    Whether the string opening at `quote` is the first statement of the
+    module or of the def/class whose header precedes it.
+    """
+    if data[line_start:quote].strip().lower() not in (b"", b"r", b"u"):
+        return False
+    lines = data[max(0, line_start - PY_HEADER_WINDOW):line_start].splitlines()
+    while lines and (not lines[-1].strip() or lines[-1].lstrip().startswith(b"#")):
+        lines.pop()
+    if not lines:
+        return line_start <= PY_HEADER_WINDOW
+    if not lines[-1].split(b"#")[0].rstrip().endswith(b":"):
+        return False
+    for i in range(len(lines) - 1, -1, -1):
+        if lines[i].lstrip().startswith((b"def ", b"class ", b"async ")):
+            return PY_DEF_HEADER.match(b"\n".join(lines[i:])) is not None
+    return False
+
+def string_spans(data, opener, closers):
+    pos = scan = 0
+    for m in opener.finditer(data):
+        if m.start() < scan:
+            continue
+        token = m.group()
+        close = data.find(closers[token], m.end())
+        scan = len(data) if close == -1 else close + len(token)
+        start = max(data.rfind(b"\n", 0, m.start()) + 1, pos)
+        stop = line_end(data, close)
+        yield start, stop, is_docstring(data, start, m.start())
+        pos = stop
+
+def count_lines(data, rules):
+    """
+    [code, comment, blank] lines in one file's bytes (or a mapping of
+    them). Block comments (or strings) are located with one regex scan
+    and the lines between them are classified in bulk, so there is no
+    per-line Python loop.
+    """
+    prefixes, opener, closers, docstrings = rules
+    counts = [0, 0, 0]
+    pos = 0
+    if opener is not None:
+        spans = string_spans if docstrings else block_spans
+        for start, stop, comment in spans(data, opener, closers):
+            count_plain(data[pos:start], prefixes, counts)
+            counts[1 if comment else 0] += len(data[start:stop].splitlines())
+            pos = stop
+    count_plain(data[pos:], prefixes, counts)
+    return counts
+
+def count_shard(root, shard):
+    """
+    Line counts for [(path, language, top-level dir)] under root, summed per
+    (top-level dir, language). Files are mapped rather than read, and
+    empty, oversized, binary (a NUL in the first LOC_BINARY_PROBE bytes) or
+    vanished files are skipped.
+    """
+    totals = {}
+    for path, lang, top in shard:
+        try:
+            with open(os.path.join(root, *path.split("/")), "rb") as fh:
+                size = os.fstat(fh.fileno()).st_size
+                if not size or size > LOC_MAX_FILE_BYTES:
+                    continue
+                with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    if data.find(b"\0", 0, LOC_BINARY_PROBE) != -1:
+                        continue
+                    counts = count_lines(data, COMMENT_RULES[lang])
+        except (OSError, ValueError):
+            continue
+        total = totals.setdefault((top, lang), [0, 0, 0])
+        for i, n in enumerate(counts):
+            total[i] += n
+    return totals
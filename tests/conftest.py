@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# app opens its on-disk caches on import; keep them out of the home directory
+os.environ.setdefault("REPOLENS_CACHE_DIR", tempfile.mkdtemp(prefix="repolens-tests-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
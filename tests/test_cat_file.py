@@ -0,0 +1,60 @@
+"""CatFile framing: every read leaves the pipe at the next header."""
+import subprocess
+
+import pytest
+
+from app import CatFile
+
+BLOBS = {
+    "empty.txt": b"",
+    "small.txt": b"hello\n",
+    "no_newline.txt": b"no newline",
+    "big.bin": bytes(range(256)) * 1024,
+    "nul.bin": b"a\0b\n\n"
+}
+
+@pytest.fixture
+def repo(tmp_path):
+    for name, data in BLOBS.items():
+        (tmp_path / name).write_bytes(data)
+    git = ["git", "-C", str(tmp_path), "-c", "user.name=t", "-c", "user.email=t@t"]
+    subprocess.run([*git, "init", "-q"], check=True)
+    subprocess.run([*git, "add", "."], check=True)
+    subprocess.run([*git, "commit", "-qm", "blobs"], check=True)
+    cat = CatFile(str(tmp_path))
+    yield cat
+    cat.close()
+
+def test_reads_whole_blobs(repo):
+    for name, data in BLOBS.items():
+        assert repo.read(f"HEAD:{name}") == data
+
+def test_limited_reads_drain_the_rest(repo):
+    assert repo.read("HEAD:big.bin", limit=10) == BLOBS["big.bin"][:10]
+    assert repo.read("HEAD:small.txt", limit=3) == b"hel"
+    assert repo.read("HEAD:small.txt", limit=100) == b"hello\n"
+    assert repo.read("HEAD:empty.txt", limit=5) == b""
+    assert repo.read("HEAD:big.bin") == BLOBS["big.bin"]
+    assert repo.read("HEAD:nul.bin", limit=4) == b"a\0b\n"
+    assert repo.read("HEAD:no_newline.txt") == b"no newline"
+
+def test_reads_by_sha(repo):
+    sha = subprocess.run(
+        ["git", "-C", repo.git_dir, "rev-parse", "HEAD:small.txt"],
+        capture_output=True, text=True, check=True
+    ).stdout.strip()
+    assert repo.read(sha) == b"hello\n"
+
+def test_missing_keeps_the_process(repo):
+    repo.read("HEAD:small.txt")
+    proc = repo.proc
+    with pytest.raises(KeyError):
+        repo.read("HEAD:nope.txt")
+    assert repo.read("HEAD:small.txt") == b"hello\n"
+    assert repo.proc is proc
+
+def test_restarts_after_the_process_dies(repo):
+    repo.read("HEAD:small.txt")
+    repo.proc.kill()
+    repo.proc.wait()
+    assert repo.read("HEAD:big.bin", limit=4) == BLOBS["big.bin"][:4]
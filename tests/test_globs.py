@@ -0,0 +1,78 @@
+"""glob_regex, compile_globs and the test conventions built from them."""
+import pytest
+
+from app import TEST_PATTERN, compile_globs, glob_regex
+
+@pytest.mark.parametrize("glob, path, matches", [
+    ("*.py", "a.py", True),
+    ("*.py", "src/deep/a.py", True),
+    ("*.py", "src/a.pyc", False),
+    ("build/", "build", True),
+    ("build/", "src/build", True),
+    ("/build", "build", True),
+    ("/build", "src/build", False),
+    ("docs/*.md", "docs/a.md", True),
+    ("docs/*.md", "docs/sub/a.md", False),
+    ("docs/**/*.md", "docs/sub/a.md", True),
+    ("docs/**/*.md", "docs/a.md", True),
+    ("vendor/**", "vendor/a/b.js", True),
+    ("vendor/**", "vendor", False),
+    ("?.c", "a.c", True),
+    ("?.c", "ab.c", False),
+    ("[!a]b", "cb", True),
+    ("[!a]b", "ab", False),
+    ("a+b.txt", "a+b.txt", True),
+    ("a+b.txt", "aab.txt", False)
+])
+def test_glob_regex(glob, path, matches):
+    assert bool(glob_regex(glob).match(path)) == matches
+
+GLOBS = ("**/tests/**", "test_*.py", "*_test.go", "*Test.java", "docs/conf.py", "Makefile")
+
+@pytest.mark.parametrize("path", [
+    "tests/a.py", "src/tests/a.py", "tests/sub/a.txt", "src/test_x.py", "test_x.py",
+    "pkg/a_test.go", "src/FooTest.java", "docs/conf.py", "Makefile", "src/Makefile",
+    "lib/tests/Makefile", "a/b/c/d/x_test.go", "x_test.go", "FooTest.java"
+])
+def test_compile_globs_agrees_with_each_glob(path):
+    combined = compile_globs(GLOBS)
+    expected = any(glob_regex(glob).match(path) for glob in GLOBS)
+    assert bool(combined.match(path)) == expected
+
+@pytest.mark.parametrize("path", [
+    "tests", "src/test_x.py/inner.c", "x_test.go.bak", "src/docs/conf.py",
+    "attests/a.py", "Latest.java", "src/testing.py"
+])
+def test_compile_globs_rejects(path):
+    combined = compile_globs(GLOBS)
+    assert not any(glob_regex(glob).match(path) for glob in GLOBS)
+    assert not combined.match(path)
+
+def test_compile_globs_anchored_only():
+    combined = compile_globs(("/setup.cfg", "docs/conf.py"))
+    assert combined.match("setup.cfg")
+    assert combined.match("docs/conf.py")
+    assert not combined.match("src/setup.cfg")
+
+@pytest.mark.parametrize("path, is_test", [
+    ("tests/test_app.py", True),
+    ("TESTS/x.py", True),
+    ("a/TEST/b.c", True),
+    ("src/Test/x.cs", True),
+    ("web/__tests__/a.js", True),
+    ("spec/models/user_spec.rb", True),
+    ("src/app.spec.ts", True),
+    ("pkg/server_test.go", True),
+    ("src/test/java/FooTest.java", True),
+    ("src/FooIT.java", True),
+    ("src/GIT.java", False),
+    ("src/Latest.java", False),
+    ("src/latest/x.py", False),
+    ("src/tests.py", False),
+    ("src/contest.py", False),
+    ("conftest.py", True),
+    ("jest.config.js", True),
+    ("App.Tests/Foo.cs", True)
+])
+def test_test_conventions(path, is_test):
+    assert bool(TEST_PATTERN.match(path)) == is_test
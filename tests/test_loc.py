@@ -0,0 +1,65 @@
+"""Line counts checked against hand-counted samples."""
+import pytest
+
+from loc import COMMENT_RULES, count_lines, count_shard
+
+SAMPLES = [
+    # (language, source, [code, comment, blank])
+    ("Python", b'''"""Module doc."""
+import os
+
+x = """
+# not a comment
+
+still a string
+"""
+
+def f(a: int = g(), b=(1, 2)) -> dict:
+    """Doc
+    string."""
+    y = \'\'\'a\'\'\' + """b"""
+    return x
+
+class A(B):
+    # comment
+    r"""raw doc"""
+''', [10, 5, 3]),
+    ("Python", b'''TEMPLATE = """
+<html>
+
+</html>
+"""
+QUERY = (
+    """
+    SELECT 1
+    """
+)
+''', [10, 0, 0]),
+    ("Python", b'x = """never closed\n\n', [2, 0, 0]),
+    ("C", b"  /* a\n b */\nint x; // y\n// z\n\n", [1, 3, 1]),
+    ("Lua", b"--[[ a\nb ]]\n-- c\nx = 1\n   \n/* open", [2, 3, 1]),
+]
+
+@pytest.mark.parametrize("lang, source, expected", SAMPLES)
+def test_count_lines(lang, source, expected):
+    assert count_lines(source, COMMENT_RULES[lang]) == expected
+
+def test_count_shard_sums_per_dir_and_language(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_bytes(b"# c\nx = 1\n\n")
+    (tmp_path / "src" / "b.py").write_bytes(b"y = 2\n")
+    (tmp_path / "main.c").write_bytes(b"int x; /* c */\n")
+    (tmp_path / "blob.py").write_bytes(b"x = 1\0\n")
+    (tmp_path / "empty.py").write_bytes(b"")
+    shard = [
+        ("src/a.py", "Python", "src"),
+        ("src/b.py", "Python", "src"),
+        ("main.c", "C", "."),
+        ("blob.py", "Python", "."),
+        ("empty.py", "Python", "."),
+        ("gone.py", "Python", ".")
+    ]
+    assert count_shard(str(tmp_path), shard) == {
+        ("src", "Python"): [2, 1, 1],
+        (".", "C"): [1, 0, 0]
+    }
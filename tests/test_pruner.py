@@ -0,0 +1,71 @@
+"""Pruner: PRUNE_DIRS, .gitignore negation and .gitattributes markers."""
+from app import FileEntry, Pruner, iter_files
+
+def entry(path):
+    parts = tuple(path.split("/"))
+    return FileEntry(path, parts, len(parts), 0, "file")
+
+def pruner(gitignore="", gitattributes="", dirs=("node_modules",)):
+    files = {".gitignore": gitignore.encode(), ".gitattributes": gitattributes.encode()}
+    p = Pruner(dirs)
+    p.load_rules(lambda name: files[name] if files[name] else {}[name])
+    return p
+
+def kept(p, paths):
+    return [e.path for e in p.filter(entry(path) for path in paths)]
+
+def test_prune_dirs_count_once():
+    p = pruner()
+    paths = ["node_modules/a/x.js", "node_modules/b.js", "web/node_modules/c.js", "src/a.py"]
+    assert kept(p, paths) == ["src/a.py"]
+    assert p.skipped() == 2
+
+def test_gitignore_negation():
+    p = pruner("*.log\n!keep.log\n# comment\n")
+    assert kept(p, ["a.log", "logs/b.log", "keep.log", "logs/keep.log", "a.py"]) == [
+        "keep.log", "logs/keep.log", "a.py"
+    ]
+    assert p.skipped() == 2
+
+def test_gitignore_later_rules_win():
+    p = pruner("!important.txt\n*.txt\n")
+    assert kept(p, ["important.txt", "a.txt"]) == []
+
+def test_gitignore_directory_rules():
+    p = pruner("build/\n/out\n")
+    assert kept(p, ["build/a.o", "src/build/b.o", "out/x", "src/out/y", "build.py"]) == [
+        "src/out/y", "build.py"
+    ]
+
+def test_gitattributes_vendored_and_generated():
+    p = pruner(gitattributes=(
+        "third/** linguist-vendored\n"
+        "third/ours/** -linguist-vendored\n"
+        "*.pb.go linguist-generated=true\n"
+        "*.md linguist-documentation\n"
+        "gen.go linguist-generated=false\n"
+    ))
+    paths = ["third/lib/a.c", "third/ours/b.c", "api/x.pb.go", "README.md", "gen.go"]
+    assert kept(p, paths) == ["third/ours/b.c", "README.md", "gen.go"]
+
+def test_missing_rule_files():
+    p = pruner()
+    assert p.rules == []
+    assert kept(p, ["a.log"]) == ["a.log"]
+
+def test_on_vendored_sees_vendored_files_only():
+    p = pruner("*.log\n", "ext/** linguist-vendored\n", dirs=("node_modules", "vendor", "build"))
+    seen = []
+    p.on_vendored = seen.append
+    paths = ["vendor/x/a.go", "build/out.js", "ext/y/b.c", "a.log", "src/a.py"]
+    assert kept(p, paths) == ["src/a.py"]
+    assert [e.path for e in seen] == ["vendor/x/a.go", "ext/y/b.c"]
+
+def test_walk_skips_pruned_dirs(tmp_path):
+    for path in ("src/a.py", "node_modules/pkg/index.js", "logs/x.log", "logs/keep.log"):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text("x")
+    p = pruner("logs/\n")
+    paths = sorted(e.path for e in p.filter(iter_files(str(tmp_path), pruner=p)))
+    assert paths == ["src/a.py"]
+    assert p.skipped() == 2